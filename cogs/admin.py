@@ -1,23 +1,63 @@
 from __future__ import annotations
+import asyncio
+import copy
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 from typing import TYPE_CHECKING, Dict, Any, Optional
 
 # Assuming these helper functions exist in utils/helpers.py for config data
-from utils.helpers import load_config_data, save_config_data
+from utils.helpers import load_config_data, save_config_data, embed_from_template
 
 if TYPE_CHECKING:
     from main import MyBot
 
 
 class AdminCog(commands.Cog):
+    # 設定コマンドの成功・エラーEmbedのテンプレート
+    _SUCCESS_EMBED_TEMPLATE = {"color": discord.Color.green().value}
+    _ERROR_EMBED_TEMPLATE = {"title": "❌ 設定エラー", "color": discord.Color.red().value}
+
     def __init__(self, bot: MyBot):
         self.bot = bot
         # Load config data on cog init.
         # config_data will store settings per guild ID.
-        # Example structure: {"guild_id_str": {"welcome_channel_id": 123, "logging_channel_id": 456}}
+        # Example structure: {"guild_id_str": {"welcome_channel_id": 123, "welcome_channel_mention": "<#123>", "logging_channel_id": 456, "logging_channel_mention": "<#456>"}}
         self.config_data: Dict[str, Dict[str, Any]] = load_config_data()
+        # ギルドIDごとに描画済みの /config show Embed をキャッシュ (設定変更時に破棄)
+        self._show_embed_cache: Dict[int, discord.Embed] = {}
+        # 未保存の設定変更があるかどうか。連続した変更を1回の書き込みにまとめる
+        self._config_dirty = False
+        # 定期フラッシュと終了時のフラッシュが同時に書き込まないようにするロック
+        self._config_write_lock = asyncio.Lock()
+
+    async def cog_load(self):
+        self._flush_config.start()
+
+    async def cog_unload(self):
+        # bot.close() から呼ばれる。書き込み中の保存が終わるのを待ってからループを止め、残りを保存する
+        async with self._config_write_lock:
+            self._flush_config.cancel()
+        await self._flush_config_data()
+
+    async def _flush_config_data(self):
+        """Writes a snapshot of the config data on a worker thread if there are pending changes."""
+        if not self._config_dirty:
+            return
+        async with self._config_write_lock:
+            # イベントループ側での変更と競合しないよう、スナップショットを渡す
+            snapshot = copy.deepcopy(self.config_data)
+            self._config_dirty = False
+            try:
+                await asyncio.to_thread(save_config_data, snapshot)
+            except Exception as e:
+                # 保存に失敗した場合は次回のフラッシュで再試行する
+                self._config_dirty = True
+                print(f"Error saving config data: {e}")
+
+    @tasks.loop(seconds=5)
+    async def _flush_config(self):
+        await self._flush_config_data()
 
     def _get_guild_config(self, guild_id: int) -> Dict[str, Any]:
         """
@@ -29,6 +69,21 @@ class AdminCog(commands.Cog):
             self.config_data[guild_id_str] = {} # ギルド用の空の辞書を初期化
         return self.config_data[guild_id_str]
 
+    @staticmethod
+    def _channel_display(guild: discord.Guild, guild_config: Dict[str, Any], key: str) -> str:
+        """
+        設定されたチャンネルの表示用文字列を返します。
+        設定時に保存したメンションを優先し、古いデータのみチャンネルキャッシュから解決します。
+        """
+        channel_id = guild_config.get(f"{key}_id")
+        if not channel_id:
+            return "未設定"
+        mention = guild_config.get(f"{key}_mention")
+        if mention:
+            return mention
+        channel = guild.get_channel(channel_id)
+        return channel.mention if channel else f"不明なチャンネル (ID: {channel_id})"
+
     @app_commands.command(name="ping", description="ボットの応答性を確認します。")
     async def ping(self, interaction: discord.Interaction):
         """
@@ -59,6 +114,11 @@ class AdminCog(commands.Cog):
             return
 
         guild_id = interaction.guild.id
+        cached_embed = self._show_embed_cache.get(guild_id)
+        if cached_embed is not None:
+            await interaction.response.send_message(embed=cached_embed, ephemeral=True)
+            return
+
         guild_config = self._get_guild_config(guild_id)
 
         embed = discord.Embed(
@@ -67,24 +127,15 @@ class AdminCog(commands.Cog):
         )
 
         # ウェルカムチャンネルの設定表示
-        welcome_channel_id = guild_config.get("welcome_channel_id")
-        if welcome_channel_id:
-            welcome_channel = interaction.guild.get_channel(welcome_channel_id)
-            embed.add_field(name="ウェルカムチャンネル", value=welcome_channel.mention if welcome_channel else f"不明なチャンネル (ID: {welcome_channel_id})", inline=False)
-        else:
-            embed.add_field(name="ウェルカムチャンネル", value="未設定", inline=False)
+        embed.add_field(name="ウェルカムチャンネル", value=self._channel_display(interaction.guild, guild_config, "welcome_channel"), inline=False)
 
         # ログチャンネルの設定表示
-        logging_channel_id = guild_config.get("logging_channel_id")
-        if logging_channel_id:
-            logging_channel = interaction.guild.get_channel(logging_channel_id)
-            embed.add_field(name="ログチャンネル", value=logging_channel.mention if logging_channel else f"不明なチャンネル (ID: {logging_channel_id})", inline=False)
-        else:
-            embed.add_field(name="ログチャンネル", value="未設定", inline=False)
+        embed.add_field(name="ログチャンネル", value=self._channel_display(interaction.guild, guild_config, "logging_channel"), inline=False)
 
         # 必要に応じて他の設定もここに追加
 
         embed.set_footer(text="設定を変更するには /config set_<設定名> コマンドを使用してください。")
+        self._show_embed_cache[guild_id] = embed
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @config_group.command(name="set_welcome_channel", description="ウェルカムメッセージを送信するチャンネルを設定します。")
@@ -103,19 +154,20 @@ class AdminCog(commands.Cog):
         try:
             # ギルドコンフィグにウェルカムチャンネルIDを保存
             guild_config["welcome_channel_id"] = channel.id
-            save_config_data(self.config_data) # 更新されたコンフィグデータをファイルに保存
-            embed = discord.Embed(
+            guild_config["welcome_channel_mention"] = channel.mention # 表示用にメンションも保存
+            self._show_embed_cache.pop(guild_id, None) # 表示用キャッシュを破棄
+            self._config_dirty = True # 更新されたコンフィグデータは定期フラッシュで保存
+            embed = embed_from_template(
+                self._SUCCESS_EMBED_TEMPLATE,
                 title="✅ ウェルカムチャンネル設定完了",
-                description=f"ウェルカムチャンネルを {channel.mention} に設定しました。",
-                color=discord.Color.green()
+                description=f"ウェルカムチャンネルを {channel.mention} に設定しました。"
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
         except Exception as e:
             # 設定保存中にエラーが発生した場合のハンドリング
-            embed = discord.Embed(
-                title="❌ 設定エラー",
-                description=f"ウェルカムチャンネルの設定中にエラーが発生しました: {e}",
-                color=discord.Color.red()
+            embed = embed_from_template(
+                self._ERROR_EMBED_TEMPLATE,
+                description=f"ウェルカムチャンネルの設定中にエラーが発生しました: {e}"
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -135,19 +187,20 @@ class AdminCog(commands.Cog):
         try:
             # ギルドコンフィグにログチャンネルIDを保存
             guild_config["logging_channel_id"] = channel.id
-            save_config_data(self.config_data) # 更新されたコンフィグデータをファイルに保存
-            embed = discord.Embed(
+            guild_config["logging_channel_mention"] = channel.mention # 表示用にメンションも保存
+            self._show_embed_cache.pop(guild_id, None) # 表示用キャッシュを破棄
+            self._config_dirty = True # 更新されたコンフィグデータは定期フラッシュで保存
+            embed = embed_from_template(
+                self._SUCCESS_EMBED_TEMPLATE,
                 title="✅ ログチャンネル設定完了",
-                description=f"ログチャンネルを {channel.mention} に設定しました。",
-                color=discord.Color.green()
+                description=f"ログチャンネルを {channel.mention} に設定しました。"
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
         except Exception as e:
             # 設定保存中にエラーが発生した場合のハンドリング
-            embed = discord.Embed(
-                title="❌ 設定エラー",
-                description=f"ログチャンネルの設定中にエラーが発生しました: {e}",
-                color=discord.Color.red()
+            embed = embed_from_template(
+                self._ERROR_EMBED_TEMPLATE,
+                description=f"ログチャンネルの設定中にエラーが発生しました: {e}"
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
 
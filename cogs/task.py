@@ -1,48 +1,377 @@
 from __future__ import annotations
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
+import asyncio
+import calendar
 import datetime
 import typing
-import uuid
+import secrets
 import os
-import json
+import functools
+import time
+import collections
+import itertools
+import re
+from pathlib import Path
+import ijson
+import msgspec
+
+from utils.helpers import embed_from_template
 
 # Define paths for data files
-TASKS_FILE = 'data/tasks.json'
+# タスクはNDJSON形式の追記専用ログとして保存する (1行に1つの変更)
+TASKS_FILE = 'data/tasks.ndjson'
+# 旧形式 (全タスクを1つのJSONに保存) のファイル。起動時に移行する
+LEGACY_TASKS_FILE = 'data/tasks.json'
+
+# このサイズ (バイト) を超えるタスクファイルはijsonでストリーム解析する
+STREAM_THRESHOLD = 4 * 1024 * 1024
+
+# ユーザー解決キャッシュの有効期間 (秒) と最大件数
+USER_CACHE_TTL = 300
+USER_CACHE_MAX_SIZE = 512
+
+# YYYY-MM-DD形式の期限
+_DATE_RE = re.compile(r'\A([0-9]{4})-([0-9]{2})-([0-9]{2})\Z')
 
 # Helper functions for JSON persistence (assuming they are in utils/helpers.py but included here for self-containment)
-# In a real project, these would be imported from `from utils.helpers import load_json, save_json`
-def load_json(file_path: str) -> dict:
-    """Loads JSON data from a specified file path."""
-    if not os.path.exists(file_path):
-        return {}
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        print(f"Warning: Could not decode JSON from {file_path}. Returning empty dict.")
-        return {}
-    except Exception as e:
-        print(f"Error loading JSON from {file_path}: {e}")
-        return {}
-
-def save_json(file_path: str, data: dict):
-    """Saves JSON data to a specified file path."""
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+# In a real project, these would be imported from `from utils.helpers import read_json, write_atomic, append_lines`
+def read_json(file_path: str) -> typing.Any:
+    """Decodes a JSON file from raw bytes, raising on I/O or decode errors."""
+    return msgspec.json.decode(Path(file_path).read_bytes())
+
+def iter_tasks(file_path: str) -> typing.Iterator[dict]:
+    """Yields task records from a tasks file, streaming large files instead of loading them whole.
+
+    I/O and decode errors propagate so callers never mistake a broken file for an empty one.
+    """
+    if os.path.getsize(file_path) <= STREAM_THRESHOLD:
+        yield from read_json(file_path).get('tasks', [])
+        return
+    with open(file_path, 'rb') as f:
+        yield from ijson.items(f, 'tasks.item', use_float=True)
+
+@functools.lru_cache(maxsize=None)
+def _ensure_dir(dir_path: str) -> None:
+    """Creates the directory once; repeated saves skip the makedirs syscall."""
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+
+class Task(msgspec.Struct, tag_field="op", tag="add"):
+    """A single task record. Timestamps are epoch floats (ISO strings for legacy records).
+
+    Encoding a Task yields its 'add' log line directly, tagged with "op": "add".
+    """
+    id: str
+    title: str
+    description: str
+    due_date: typing.Optional[str]
+    assignee_id: typing.Optional[int]
+    creator_id: int
+    created_at: typing.Union[float, str]
+    status: str
+    completed_at: typing.Union[float, str, None] = None
+    deleted_at: typing.Union[float, str, None] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Task:
+        """Builds a Task from a stored record, ignoring unknown keys."""
+        return msgspec.convert(data, cls)
+
+class EditOp(msgspec.Struct, tag_field="op", tag="edit"):
+    """An edit log line. Fields left UNSET were not changed and are omitted when encoded."""
+    id: str
+    title: typing.Union[str, msgspec.UnsetType] = msgspec.UNSET
+    description: typing.Union[str, msgspec.UnsetType] = msgspec.UNSET
+    due_date: typing.Union[str, None, msgspec.UnsetType] = msgspec.UNSET
+    assignee_id: typing.Union[int, None, msgspec.UnsetType] = msgspec.UNSET
+
+EDIT_FIELDS = tuple(name for name in EditOp.__struct_fields__ if name != 'id')
+
+class DoneOp(msgspec.Struct, tag_field="op", tag="done"):
+    """A log line marking a task as done."""
+    id: str
+    at: typing.Union[float, str, None] = None
+
+class DeleteOp(msgspec.Struct, tag_field="op", tag="delete"):
+    """A log line marking a task as deleted."""
+    id: str
+    at: typing.Union[float, str, None] = None
+
+LogRecord = typing.Union[Task, EditOp, DoneOp, DeleteOp]
+
+# 使い回すエンコーダ/デコーダ (ログの各行は "op" タグで判別される型付きレコード)
+ENCODER = msgspec.json.Encoder()
+LINE_DECODER = msgspec.json.Decoder(LogRecord)
+
+def write_atomic(file_path: str, data: bytes):
+    """Replaces the file with the given bytes atomically (temp file + os.replace)."""
+    _ensure_dir(os.path.dirname(file_path))
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
+
+def append_lines(file_path: str, data: bytes):
+    """Appends already-encoded NDJSON lines to the end of the file.
+
+    If the file ends in a partial line (an earlier append failed or was interrupted midway),
+    a newline is written first so the fragment cannot swallow the next record.
+    """
+    _ensure_dir(os.path.dirname(file_path))
+    with open(file_path, 'ab+') as f:
+        end = f.seek(0, os.SEEK_END)
+        if end:
+            f.seek(end - 1)
+            if f.read(1) != b"\n":
+                data = b"\n" + data
+        f.write(data)
+
+def encode_line(record: LogRecord, buf: bytearray):
+    """Encodes one log record onto the end of buf as a single NDJSON line."""
+    ENCODER.encode_into(record, buf, -1)
+    buf.extend(b"\n")
+
+def _apply_mutation(by_id: typing.Dict[str, Task], record: LogRecord):
+    """Applies one decoded log record to the tasks keyed by id."""
+    if isinstance(record, Task):
+        by_id[record.id] = record
+        return
+    task = by_id.get(record.id)
+    if task is None:
+        return
+    if isinstance(record, EditOp):
+        for name in EDIT_FIELDS:
+            value = getattr(record, name)
+            if value is not msgspec.UNSET:
+                setattr(task, name, value)
+    elif isinstance(record, DoneOp):
+        task.status = 'done'
+        task.completed_at = record.at
+    elif isinstance(record, DeleteOp):
+        task.status = 'deleted'
+        task.deleted_at = record.at
+
+def replay_mutations(file_path: str) -> typing.Dict[str, Task]:
+    """Rebuilds the tasks keyed by id by replaying the mutation log in order.
+
+    Invalid lines are skipped one at a time; I/O errors other than a missing file propagate.
+    """
+    by_id: typing.Dict[str, Task] = {}
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error saving JSON to {file_path}: {e}")
+        with open(file_path, 'rb') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    _apply_mutation(by_id, LINE_DECODER.decode(line))
+                except msgspec.DecodeError as e:
+                    print(f"Warning: Skipping invalid line {line_no} in {file_path}: {e}")
+    except FileNotFoundError:
+        pass
+    return by_id
+
+def _validate_due_date(due_date: str) -> None:
+    """Raises ValueError unless due_date is a real calendar date in YYYY-MM-DD form."""
+    m = _DATE_RE.match(due_date)
+    if not m:
+        raise ValueError(f"invalid date: {due_date!r}")
+    year, month, day = int(m[1]), int(m[2]), int(m[3])
+    if not (year >= 1 and 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]):
+        raise ValueError(f"invalid date: {due_date!r}")
+
+@functools.lru_cache(maxsize=1024)
+def _iso(ts: typing.Union[float, str]) -> str:
+    """Formats an epoch timestamp as an ISO 8601 UTC string (legacy ISO strings pass through).
+
+    Results are memoized so repeated detail views of the same task skip datetime construction.
+    """
+    if isinstance(ts, str):
+        return ts
+    return datetime.datetime.fromtimestamp(ts, tz=datetime.timezone.utc).isoformat(timespec='seconds')
 
 class TaskCog(commands.Cog):
+    # 作成・完了・削除確認Embedのテンプレート (固定部分はロード時に1度だけ構築)
+    _ADD_EMBED_TEMPLATE = {
+        "title": "✅ タスクが作成されました！",
+        "color": discord.Color.green().value,
+        "footer": {"text": "タスク管理ボット"},
+        "fields": [{"name": "ステータス", "value": "active", "inline": True}],
+    }
+    _DONE_EMBED_TEMPLATE = {
+        "title": "✅ タスクが完了しました！",
+        "color": discord.Color.green().value,
+        "footer": {"text": "タスク管理ボット"},
+        "fields": [{"name": "新しいステータス", "value": "完了済み", "inline": True}],
+    }
+    _DELETE_EMBED_TEMPLATE = {
+        "title": "🗑️ タスクが削除されました！",
+        "color": discord.Color.red().value,
+        "footer": {"text": "タスク管理ボット"},
+        "fields": [{"name": "新しいステータス", "value": "削除済み", "inline": True}],
+    }
+
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        # Initialize task data by loading from 'data/tasks.json'
-        # Ensure 'tasks' key exists in the loaded data, defaulting to an empty list.
-        self.tasks = load_json(TASKS_FILE)
-        self.tasks.setdefault('tasks', [])
+        # Initialize task data by replaying 'data/tasks.ndjson'
+        # タスクIDからタスクへのインデックス (O(1)で検索するため)
+        # 読み込みに失敗した場合は例外を送出し、空のデータでログを上書きしないようにする
+        self._by_id: typing.Dict[str, Task] = {}
+        # 旧形式から移行した場合、NDJSONへの書き出しが成功するまでTrue
+        # (その間は追記せずにコンパクションを行い、旧データだけが失われないようにする)
+        self._migration_pending = False
+        if os.path.exists(TASKS_FILE) or not os.path.exists(LEGACY_TASKS_FILE):
+            self._by_id = replay_mutations(TASKS_FILE)
+        else:
+            # 旧形式のファイルを1件ずつ読み込む (不正なレコードのみスキップ)
+            for record in iter_tasks(LEGACY_TASKS_FILE):
+                try:
+                    task = Task.from_dict(record)
+                except (msgspec.ValidationError, TypeError) as e:
+                    print(f"Warning: Skipping invalid task in {LEGACY_TASKS_FILE}: {e}")
+                    continue
+                self._by_id[task.id] = task
+            self._migration_pending = True
+        # アクティブなタスクの一覧表示用の並列配列 (task_listが必要なフィールドだけを保持)
+        self._active_ids: typing.List[str] = []
+        self._active_titles: typing.List[str] = []
+        self._active_assignee_ids: typing.List[typing.Optional[int]] = []
+        self._active_due_dates: typing.List[typing.Optional[str]] = []
+        # タスクIDから並列配列上の位置へのインデックス
+        self._active_index: typing.Dict[str, int] = {}
+        for task in self._by_id.values():
+            if task.status == 'active':
+                self._activate(task)
+        # 未保存の変更行。バースト的な編集を1回の追記にまとめる
+        self._pending = bytearray()
+        # 追記とコンパクションが同時にファイルへ書き込まないようにするロック
+        self._write_lock = asyncio.Lock()
+        # ユーザーIDから (取得時刻, ユーザー) へのLRUキャッシュ
+        self._user_cache: collections.OrderedDict[int, typing.Tuple[float, discord.User]] = collections.OrderedDict()
+
+    async def cog_load(self):
+        if self._migration_pending:
+            await self._compact()
+        self._flush_tasks.start()
+        self._compact_tasks.start()
+
+    async def cog_unload(self):
+        # 書き込み中のフラッシュ/コンパクションが終わるのを待ってからループを止める
+        async with self._write_lock:
+            self._flush_tasks.cancel()
+            self._compact_tasks.cancel()
+        await self._flush()
+
+    def _activate(self, task: Task):
+        """Appends an active task to the parallel arrays used by task_list."""
+        self._active_index[task.id] = len(self._active_ids)
+        self._active_ids.append(task.id)
+        self._active_titles.append(task.title)
+        self._active_assignee_ids.append(task.assignee_id)
+        self._active_due_dates.append(task.due_date)
+
+    def _deactivate(self, task_id: str):
+        """Removes a task from the parallel arrays by moving the last entry into its slot."""
+        index = self._active_index.pop(task_id, None)
+        if index is None:
+            return
+        arrays = (self._active_ids, self._active_titles, self._active_assignee_ids, self._active_due_dates)
+        last = len(self._active_ids) - 1
+        if index != last:
+            for array in arrays:
+                array[index] = array[last]
+            self._active_index[self._active_ids[index]] = index
+        for array in arrays:
+            array.pop()
+
+    def _refresh_active(self, task: Task):
+        """Copies the listed fields of an edited task back into the parallel arrays."""
+        index = self._active_index.get(task.id)
+        if index is None:
+            return
+        self._active_titles[index] = task.title
+        self._active_assignee_ids[index] = task.assignee_id
+        self._active_due_dates[index] = task.due_date
+
+    def _record(self, record: LogRecord):
+        """Queues a log record to be appended to the task log by the next flush."""
+        encode_line(record, self._pending)
+
+    async def _flush(self):
+        """Appends the pending mutations to the task log on a worker thread."""
+        if not self._pending:
+            return
+        if self._migration_pending:
+            # 移行の書き出しが未完了のまま追記すると、次回起動時に旧形式のタスクが読まれなくなる
+            await self._compact()
+            return
+        async with self._write_lock:
+            data = bytes(self._pending)
+            self._pending.clear()
+            try:
+                await asyncio.to_thread(append_lines, TASKS_FILE, data)
+            except Exception as e:
+                # 失敗した変更は次回のフラッシュで再試行する
+                self._pending[0:0] = data
+                print(f"Error appending to {TASKS_FILE}: {e}")
+
+    async def _compact(self):
+        """Rewrites the task log as one 'add' line per task, dropping superseded mutations."""
+        async with self._write_lock:
+            data = bytearray()
+            for task in self._by_id.values():
+                encode_line(task, data)
+            # スナップショットには未保存の変更も含まれる
+            pending = bytes(self._pending)
+            self._pending.clear()
+            try:
+                await asyncio.to_thread(write_atomic, TASKS_FILE, data)
+                self._migration_pending = False
+            except Exception as e:
+                # 書き出しに失敗した場合は未保存の変更を戻し、既存のログはそのまま残す
+                self._pending[0:0] = pending
+                print(f"Error saving data to {TASKS_FILE}: {e}")
+
+    @tasks.loop(seconds=2)
+    async def _flush_tasks(self):
+        await self._flush()
+
+    @tasks.loop(hours=1)
+    async def _compact_tasks(self):
+        # tasks.loopは開始直後に1回目を実行するため、最初の1周期はスキップする
+        if self._compact_tasks.current_loop == 0:
+            return
+        await self._compact()
+
+    async def _resolve_user(self, user_id: typing.Optional[int]) -> typing.Optional[discord.User]:
+        """Resolves a user ID via the TTL cache, then the client cache, then the Discord API."""
+        if not user_id:
+            return None
+        now = time.monotonic()
+        entry = self._user_cache.get(user_id)
+        if entry and now - entry[0] < USER_CACHE_TTL:
+            self._user_cache.move_to_end(user_id)
+            return entry[1]
+
+        user = self.bot.get_user(user_id)
+        if user is None:
+            try:
+                user = await self.bot.fetch_user(user_id)
+            except discord.HTTPException:
+                return None
+
+        self._user_cache[user_id] = (now, user)
+        self._user_cache.move_to_end(user_id)
+        if len(self._user_cache) > USER_CACHE_MAX_SIZE:
+            self._user_cache.popitem(last=False)
+        return user
+
+    async def _resolve_users(self, user_ids: typing.Iterable[int]) -> typing.Dict[int, discord.User]:
+        """Resolves several user IDs in parallel."""
+        unique_ids = [uid for uid in set(user_ids) if uid]
+        users = await asyncio.gather(*(self._resolve_user(uid) for uid in unique_ids))
+        return {uid: user for uid, user in zip(unique_ids, users) if user is not None}
 
     @app_commands.command(name="task_add", description="新しいタスクを作成します。")
     @app_commands.describe(
@@ -63,13 +392,15 @@ class TaskCog(commands.Cog):
         await interaction.response.defer(ephemeral=True) # タイムアウトを防ぐため、即座に応答を保留
 
         # ユニークなタスクIDを生成
-        task_id = str(uuid.uuid4())[:8] # 短いIDにするため最初の8文字を使用
+        task_id = secrets.token_hex(4) # 8桁の16進数の短いID
+        while task_id in self._by_id: # 既存IDとの衝突を回避
+            task_id = secrets.token_hex(4)
 
         parsed_due_date = None
         if due_date:
             try:
                 # YYYY-MM-DD形式の期限を検証
-                datetime.datetime.strptime(due_date, '%Y-%m-%d')
+                _validate_due_date(due_date)
                 parsed_due_date = due_date
             except ValueError:
                 await interaction.followup.send(
@@ -78,41 +409,36 @@ class TaskCog(commands.Cog):
                 )
                 return
 
-        # 新しいタスクの辞書を構築
-        new_task = {
-            'id': task_id,
-            'title': title,
-            'description': description if description else "",
-            'due_date': parsed_due_date,
-            'assignee_id': assignee.id if assignee else None,
-            'creator_id': interaction.user.id,
-            'created_at': datetime.datetime.utcnow().isoformat(),
-            'status': "active"
-        }
+        # 新しいタスクを構築
+        new_task = Task(
+            id=task_id,
+            title=title,
+            description=description if description else "",
+            due_date=parsed_due_date,
+            assignee_id=assignee.id if assignee else None,
+            creator_id=interaction.user.id,
+            created_at=time.time(),
+            status="active"
+        )
 
         # タスクリストに新しいタスクを追加
-        self.tasks['tasks'].append(new_task)
-
-        try:
-            # 更新されたタスクデータをJSONファイルに保存
-            save_json(TASKS_FILE, self.tasks)
-        except Exception as e:
-            await interaction.followup.send(f"エラー: タスクの保存中に問題が発生しました。{e}", ephemeral=True)
-            return
-
-        # タスク作成確認のEmbedを作成して送信
-        embed = discord.Embed(
-            title="✅ タスクが作成されました！",
-            description=f"タスクID: `{task_id}`",
-            color=discord.Color.green()
+        self._by_id[task_id] = new_task
+        self._activate(new_task)
+
+        # 変更をログに記録 (保存は定期フラッシュでまとめて行う)
+        self._record(new_task)
+
+        # タスク作成確認のEmbedをテンプレートから作成して送信
+        fields = [{"name": "タイトル", "value": title, "inline": False}]
+        if description: fields.append({"name": "詳細", "value": description, "inline": False})
+        if parsed_due_date: fields.append({"name": "期限", "value": parsed_due_date, "inline": True})
+        if assignee: fields.append({"name": "担当者", "value": assignee.mention, "inline": True})
+        fields.append({"name": "作成者", "value": interaction.user.mention, "inline": True})
+        embed = embed_from_template(
+            self._ADD_EMBED_TEMPLATE,
+            fields=fields,
+            description=f"タスクID: `{task_id}`"
         )
-        embed.add_field(name="タイトル", value=title, inline=False)
-        if description: embed.add_field(name="詳細", value=description, inline=False)
-        if parsed_due_date: embed.add_field(name="期限", value=parsed_due_date, inline=True)
-        if assignee: embed.add_field(name="担当者", value=assignee.mention, inline=True)
-        embed.add_field(name="作成者", value=interaction.user.mention, inline=True)
-        embed.add_field(name="ステータス", value="active", inline=True)
-        embed.set_footer(text="タスク管理ボット")
 
         await interaction.followup.send(embed=embed)
 
@@ -124,10 +450,10 @@ class TaskCog(commands.Cog):
         """アクティブなタスクの一覧をEmbedで表示します。"""
         await interaction.response.defer(ephemeral=False) # 全員に見えるように応答を保留
 
-        # アクティブなタスクのみをフィルタリング
-        active_tasks = [task for task in self.tasks['tasks'] if task['status'] == 'active']
+        # アクティブなタスクは並列配列から取得 (完了・削除済みタスクは走査しない)
+        active_count = len(self._active_ids)
 
-        if not active_tasks:
+        if not active_count:
             await interaction.followup.send("現在、アクティブなタスクはありません。", ephemeral=True)
             return
 
@@ -137,28 +463,30 @@ class TaskCog(commands.Cog):
             description="現在進行中のタスクです。",
             color=discord.Color.blue()
         )
-        embed.set_footer(text=f"合計 {len(active_tasks)} 件のタスク")
+        embed.set_footer(text=f"合計 {active_count} 件のタスク")
 
         # 各タスクの情報をEmbedのフィールドに追加
-        # Embedのフィールド数には限りがあるため、簡潔に表示
-        for i, task in enumerate(active_tasks):
-            if i >= 10: # 最大10件まで表示し、それ以上は省略
-                embed.add_field(name="...", value="さらに多くのタスクがあります。", inline=False)
-                break
-            
-            assignee_mention = "未割り当て"
-            if task['assignee_id']:
-                assignee = self.bot.get_user(task['assignee_id']) or await self.bot.fetch_user(task['assignee_id'])
-                if assignee: assignee_mention = assignee.mention
-
-            due_date_str = f"期限: {task['due_date']}" if task['due_date'] else "期限なし"
+        # Embedのフィールド数には限りがあるため、最大10件まで簡潔に表示
+        rows = zip(self._active_ids, self._active_titles, self._active_assignee_ids, self._active_due_dates)
+        shown = list(itertools.islice(rows, 10))
+        has_more = next(rows, None) is not None
+        # 担当者をまとめて並列に解決
+        users = await self._resolve_users(assignee_id for _, _, assignee_id, _ in shown)
+        for task_id, title, assignee_id, due_date in shown:
+            assignee = users.get(assignee_id)
+            assignee_mention = assignee.mention if assignee else "未割り当て"
+
+            due_date_str = f"期限: {due_date}" if due_date else "期限なし"
             
             embed.add_field(
-                name=f"ID: {task['id']} | {task['title']}",
+                name=f"ID: {task_id} | {title}",
                 value=f"担当: {assignee_mention} | {due_date_str}",
                 inline=False
             )
 
+        if has_more: # 11件目以降は省略
+            embed.add_field(name="...", value="さらに多くのタスクがあります。", inline=False)
+
         await interaction.followup.send(embed=embed)
 
     @app_commands.command(name="task_done", description="指定したタスクを完了済みにします。")
@@ -173,43 +501,33 @@ class TaskCog(commands.Cog):
         """指定されたタスクを完了済みにマークします。"""
         await interaction.response.defer(ephemeral=True) # タイムアウトを防ぐため、即座に応答を保留
 
-        found_task = None
-        for task in self.tasks['tasks']:
-            if task['id'] == task_id:
-                found_task = task
-                break
+        found_task = self._by_id.get(task_id)
 
         if not found_task:
             await interaction.followup.send("エラー: 指定されたタスクは見つかりませんでした。", ephemeral=True)
             return
 
-        if found_task['status'] == 'done':
+        if found_task.status == 'done':
             await interaction.followup.send("エラー: このタスクは既に完了済みです。", ephemeral=True)
             return
-        if found_task['status'] == 'deleted':
+        if found_task.status == 'deleted':
             await interaction.followup.send("エラー: このタスクは既に削除されています。", ephemeral=True)
             return
 
         # タスクのステータスを「完了」に更新し、完了日時を記録
-        found_task['status'] = 'done'
-        found_task['completed_at'] = datetime.datetime.utcnow().isoformat()
-
-        try:
-            # 更新されたタスクデータをJSONファイルに保存
-            save_json(TASKS_FILE, self.tasks)
-        except Exception as e:
-            await interaction.followup.send(f"エラー: タスクの保存中に問題が発生しました。{e}", ephemeral=True)
-            return
-
-        # タスク完了確認のEmbedを作成して送信
-        embed = discord.Embed(
-            title="✅ タスクが完了しました！",
-            description=f"タスクID: `{task_id}`",
-            color=discord.Color.green()
+        found_task.status = 'done'
+        self._deactivate(task_id)
+        found_task.completed_at = time.time()
+
+        # 変更をログに記録 (保存は定期フラッシュでまとめて行う)
+        self._record(DoneOp(id=task_id, at=found_task.completed_at))
+
+        # タスク完了確認のEmbedをテンプレートから作成して送信
+        embed = embed_from_template(
+            self._DONE_EMBED_TEMPLATE,
+            fields=[{"name": "タイトル", "value": found_task.title, "inline": False}],
+            description=f"タスクID: `{task_id}`"
         )
-        embed.add_field(name="タイトル", value=found_task['title'], inline=False)
-        embed.add_field(name="新しいステータス", value="完了済み", inline=True)
-        embed.set_footer(text="タスク管理ボット")
 
         await interaction.followup.send(embed=embed)
 
@@ -225,40 +543,30 @@ class TaskCog(commands.Cog):
         """指定されたタスクを削除済みにマークします（履歴は保持）。"""
         await interaction.response.defer(ephemeral=True) # タイムアウトを防ぐため、即座に応答を保留
 
-        found_task = None
-        for task in self.tasks['tasks']:
-            if task['id'] == task_id:
-                found_task = task
-                break
+        found_task = self._by_id.get(task_id)
 
         if not found_task:
             await interaction.followup.send("エラー: 指定されたタスクは見つかりませんでした。", ephemeral=True)
             return
 
-        if found_task['status'] == 'deleted':
+        if found_task.status == 'deleted':
             await interaction.followup.send("エラー: このタスクは既に削除済みです。", ephemeral=True)
             return
 
         # タスクのステータスを「削除済み」に更新し、削除日時を記録
-        found_task['status'] = 'deleted'
-        found_task['deleted_at'] = datetime.datetime.utcnow().isoformat()
-
-        try:
-            # 更新されたタスクデータをJSONファイルに保存
-            save_json(TASKS_FILE, self.tasks)
-        except Exception as e:
-            await interaction.followup.send(f"エラー: タスクの保存中に問題が発生しました。{e}", ephemeral=True)
-            return
-
-        # タスク削除確認のEmbedを作成して送信
-        embed = discord.Embed(
-            title="🗑️ タスクが削除されました！",
-            description=f"タスクID: `{task_id}`",
-            color=discord.Color.red()
+        found_task.status = 'deleted'
+        self._deactivate(task_id)
+        found_task.deleted_at = time.time()
+
+        # 変更をログに記録 (保存は定期フラッシュでまとめて行う)
+        self._record(DeleteOp(id=task_id, at=found_task.deleted_at))
+
+        # タスク削除確認のEmbedをテンプレートから作成して送信
+        embed = embed_from_template(
+            self._DELETE_EMBED_TEMPLATE,
+            fields=[{"name": "タイトル", "value": found_task.title, "inline": False}],
+            description=f"タスクID: `{task_id}`"
         )
-        embed.add_field(name="タイトル", value=found_task['title'], inline=False)
-        embed.add_field(name="新しいステータス", value="削除済み", inline=True)
-        embed.set_footer(text="タスク管理ボット")
 
         await interaction.followup.send(embed=embed)
 
@@ -282,47 +590,42 @@ class TaskCog(commands.Cog):
         """指定されたタスクの情報を編集します。"""
         await interaction.response.defer(ephemeral=True) # タイムアウトを防ぐため、即座に応答を保留
 
-        found_task = None
-        for task in self.tasks['tasks']:
-            if task['id'] == task_id:
-                found_task = task
-                break
+        found_task = self._by_id.get(task_id)
 
         if not found_task:
             await interaction.followup.send("エラー: 指定されたタスクは見つかりませんでした。", ephemeral=True)
             return
 
-        # 提供された引数に基づいてタスク情報を更新
+        # 提供された引数に基づいて変更内容を構築
+        changes: typing.Dict[str, typing.Any] = {}
         if title is not None:
-            found_task['title'] = title
+            changes['title'] = title
         if description is not None:
-            found_task['description'] = description
+            changes['description'] = description
         if assignee is not None:
-            found_task['assignee_id'] = assignee.id
-        
-        parsed_due_date = found_task['due_date'] # 既存の期限を保持
+            changes['assignee_id'] = assignee.id
+
         if due_date is not None:
             if due_date == "none": # 期限をクリアするオプション
-                parsed_due_date = None
+                changes['due_date'] = None
             else:
                 try:
                     # YYYY-MM-DD形式の期限を検証
-                    datetime.datetime.strptime(due_date, '%Y-%m-%d')
-                    parsed_due_date = due_date
+                    _validate_due_date(due_date)
+                    changes['due_date'] = due_date
                 except ValueError:
                     await interaction.followup.send(
                         "エラー: 期限の形式が無効です。YYYY-MM-DD形式で入力するか 'none' でクリアしてください。", 
                         ephemeral=True
                     )
                     return
-        found_task['due_date'] = parsed_due_date
 
-        try:
-            # 更新されたタスクデータをJSONファイルに保存
-            save_json(TASKS_FILE, self.tasks)
-        except Exception as e:
-            await interaction.followup.send(f"エラー: タスクの保存中に問題が発生しました。{e}", ephemeral=True)
-            return
+        if changes:
+            for name, value in changes.items():
+                setattr(found_task, name, value)
+            self._refresh_active(found_task)
+            # 変更をログに記録 (保存は定期フラッシュでまとめて行う)
+            self._record(EditOp(id=task_id, **changes))
 
         # タスク編集確認のEmbedを作成して送信
         embed = discord.Embed(
@@ -330,16 +633,14 @@ class TaskCog(commands.Cog):
             description=f"タスクID: `{task_id}`",
             color=discord.Color.blue()
         )
-        embed.add_field(name="タイトル", value=found_task['title'], inline=False)
-        embed.add_field(name="詳細", value=found_task['description'] if found_task['description'] else "なし", inline=False)
-        embed.add_field(name="期限", value=found_task['due_date'] if found_task['due_date'] else "なし", inline=True)
+        embed.add_field(name="タイトル", value=found_task.title, inline=False)
+        embed.add_field(name="詳細", value=found_task.description if found_task.description else "なし", inline=False)
+        embed.add_field(name="期限", value=found_task.due_date if found_task.due_date else "なし", inline=True)
         
-        assignee_mention = "未割り当て"
-        if found_task['assignee_id']:
-            assignee_user = self.bot.get_user(found_task['assignee_id']) or await self.bot.fetch_user(found_task['assignee_id'])
-            if assignee_user: assignee_mention = assignee_user.mention
+        assignee_user = await self._resolve_user(found_task.assignee_id)
+        assignee_mention = assignee_user.mention if assignee_user else "未割り当て"
         embed.add_field(name="担当者", value=assignee_mention, inline=True)
-        embed.add_field(name="ステータス", value=found_task['status'], inline=True)
+        embed.add_field(name="ステータス", value=found_task.status, inline=True)
         embed.set_footer(text="タスク管理ボット")
 
         await interaction.followup.send(embed=embed)
@@ -356,11 +657,7 @@ class TaskCog(commands.Cog):
         """指定されたタスクの全詳細情報をEmbedで表示します。"""
         await interaction.response.defer(ephemeral=False) # 全員に見えるように応答を保留
 
-        found_task = None
-        for task in self.tasks['tasks']:
-            if task['id'] == task_id:
-                found_task = task
-                break
+        found_task = self._by_id.get(task_id)
 
         if not found_task:
             await interaction.followup.send("エラー: 指定されたタスクは見つかりませんでした。", ephemeral=True)
@@ -368,44 +665,40 @@ class TaskCog(commands.Cog):
 
         # タスクのステータスに基づいてEmbedの色を設定
         color = discord.Color.blue()
-        if found_task['status'] == 'active':
+        if found_task.status == 'active':
             color = discord.Color.green()
-        elif found_task['status'] == 'done':
+        elif found_task.status == 'done':
             color = discord.Color.light_grey()
-        elif found_task['status'] == 'deleted':
+        elif found_task.status == 'deleted':
             color = discord.Color.red()
 
         # タスク詳細表示用のEmbedを作成
         embed = discord.Embed(
-            title=f"🔍 タスク詳細: {found_task['title']}",
-            description=f"タスクID: `{found_task['id']}`",
+            title=f"🔍 タスク詳細: {found_task.title}",
+            description=f"タスクID: `{found_task.id}`",
             color=color
         )
 
-        embed.add_field(name="タイトル", value=found_task['title'], inline=False)
-        embed.add_field(name="詳細", value=found_task['description'] if found_task['description'] else "なし", inline=False)
-        embed.add_field(name="ステータス", value=found_task['status'].capitalize(), inline=True)
-        embed.add_field(name="期限", value=found_task['due_date'] if found_task['due_date'] else "なし", inline=True)
+        embed.add_field(name="タイトル", value=found_task.title, inline=False)
+        embed.add_field(name="詳細", value=found_task.description if found_task.description else "なし", inline=False)
+        embed.add_field(name="ステータス", value=found_task.status.capitalize(), inline=True)
+        embed.add_field(name="期限", value=found_task.due_date if found_task.due_date else "なし", inline=True)
 
-        # 担当者IDをDiscordユーザー名に解決
-        assignee_mention = "未割り当て"
-        if found_task['assignee_id']:
-            assignee = self.bot.get_user(found_task['assignee_id']) or await self.bot.fetch_user(found_task['assignee_id'])
-            if assignee: assignee_mention = assignee.mention
+        # 担当者IDと作成者IDを並列にDiscordユーザー名に解決
+        users = await self._resolve_users((found_task.assignee_id, found_task.creator_id))
+        assignee = users.get(found_task.assignee_id)
+        assignee_mention = assignee.mention if assignee else "未割り当て"
         embed.add_field(name="担当者", value=assignee_mention, inline=True)
 
-        # 作成者IDをDiscordユーザー名に解決
-        creator_mention = "不明なユーザー"
-        if found_task['creator_id']:
-            creator = self.bot.get_user(found_task['creator_id']) or await self.bot.fetch_user(found_task['creator_id'])
-            if creator: creator_mention = creator.mention
+        creator = users.get(found_task.creator_id)
+        creator_mention = creator.mention if creator else "不明なユーザー"
         embed.add_field(name="作成者", value=creator_mention, inline=True)
 
-        embed.add_field(name="作成日時", value=found_task['created_at'], inline=False)
-        if 'completed_at' in found_task and found_task['completed_at']:
-            embed.add_field(name="完了日時", value=found_task['completed_at'], inline=False)
-        if 'deleted_at' in found_task and found_task['deleted_at']:
-            embed.add_field(name="削除日時", value=found_task['deleted_at'], inline=False)
+        embed.add_field(name="作成日時", value=_iso(found_task.created_at), inline=False)
+        if found_task.completed_at:
+            embed.add_field(name="完了日時", value=_iso(found_task.completed_at), inline=False)
+        if found_task.deleted_at:
+            embed.add_field(name="削除日時", value=_iso(found_task.deleted_at), inline=False)
 
         embed.set_footer(text="タスク管理ボット")
 
@@ -1,19 +1,22 @@
 from __future__ import annotations
+import functools
 import os
 
 # TODO: Define configuration constants and environment variable retrieval
 # - DISCORD_TOKEN: Bot's authentication token
-# - PORT: Port for the keep_alive Flask server
+# - PORT: Port for the keep_alive aiohttp server
 
 DISCORD_TOKEN_ENV_VAR = "DISCORD_TOKEN"
 PORT_ENV_VAR = "PORT"
 DEFAULT_PORT = 8080
 
+@functools.cache
 def get_discord_token() -> str | None:
     # TODO: Retrieve Discord token from environment variables
     # - Return None if the token is not set
     return os.getenv(DISCORD_TOKEN_ENV_VAR)
 
+@functools.cache
 def get_port() -> int:
     # TODO: Retrieve port for keep_alive server from environment variables
     # - Return DEFAULT_PORT if the environment variable is not set or invalid
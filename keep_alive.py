@@ -1,28 +1,22 @@
 from __future__ import annotations
-from flask import Flask
-from threading import Thread
-import os
+from aiohttp import web
 
-app = Flask(__name__)
+from config import get_port
 
-@app.route('/')
-def home() -> str:
-    # TODO: Implement health check endpoint
+async def home(request: web.Request) -> web.Response:
+    # Health check endpoint
     # - Return a simple HTTP 200 OK response
     # - This endpoint is used by external services to check bot's uptime
-    return "Bot is alive!"
+    return web.Response(text="Bot is alive!")
 
-def run() -> None:
-    # TODO: Run the Flask server
-    # - Get the port from environment variables, default to 8080
-    # - Start the Flask application
-    port = int(os.getenv("PORT", 8080))
-    app.run(host='0.0.0.0', port=port)
-
-def keep_alive() -> None:
-    # TODO: Start the Flask server in a separate thread
-    # - This prevents the Flask server from blocking the main bot process
-    # - Ensure the thread is a daemon thread so it exits with the main program
-    t = Thread(target=run)
-    t.daemon = True
-    t.start()
+async def keep_alive() -> web.AppRunner:
+    # Start the aiohttp server on the bot's running event loop
+    # - No extra thread is needed; requests are served alongside the bot's coroutines
+    # - Returns the runner so the caller can clean it up on shutdown
+    app = web.Application()
+    app.router.add_get('/', home)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '0.0.0.0', get_port())
+    await site.start()
+    return runner
@@ -2,12 +2,12 @@
 from __future__ import annotations
 
 import asyncio
-import os
 from pathlib import Path
 
 import discord
 from discord.ext import commands
 
+from config import get_discord_token
 from keep_alive import keep_alive
 
 
@@ -45,9 +45,14 @@ async def load_cogs() -> None:
 
 
 async def main() -> None:
-    keep_alive()
-    await load_cogs()
-    await bot.start(os.getenv("DISCORD_TOKEN"))
+    runner = await keep_alive()
+    try:
+        # async with closes the bot on exit, which unloads the cogs so they flush pending writes
+        async with bot:
+            await load_cogs()
+            await bot.start(get_discord_token())
+    finally:
+        await runner.cleanup()
 
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@ import discord
 from discord.ext import commands
 import random
 import datetime
+from typing import Any, Dict, List, Optional
 
 def create_embed(title: str, description: str = "", color: discord.Color = discord.Color.blue()) -> discord.Embed:
     """Create a styled embed"""
@@ -18,6 +19,15 @@ def format_success(message: str) -> discord.Embed:
     """Create success embed"""
     return create_embed("✅ 成功", message, discord.Color.green())
 
+def embed_from_template(template: Dict[str, Any], fields: Optional[List[Dict[str, Any]]] = None, **overrides: Any) -> discord.Embed:
+    """Create an embed from a prebuilt dict template; `fields` go before the template's fields"""
+    # Embed.from_dict keeps nested dicts by reference, so copy them to keep the template intact
+    data = dict(template, **overrides)
+    data["fields"] = (fields or []) + [dict(field) for field in template.get("fields", [])]
+    if "footer" in data:
+        data["footer"] = dict(data["footer"])
+    return discord.Embed.from_dict(data)
+
 def random_color() -> discord.Color:
     """Generate random color"""
     return discord.Color.from_rgb(